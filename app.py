@@ -1,9 +1,40 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import pickle
+import joblib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 import streamlit.components.v1 as components
 
+# Swapping the stdlib JSON encoder for orjson when it is installed, which
+# cuts encode time on large component payloads. Calls that use keyword
+# arguments or types orjson cannot handle fall back to the stdlib encoder
+try:
+    import orjson
+
+    StdlibJsonDumps = json.dumps
+
+    def OrjsonDumps(obj, **kwargs):
+        if kwargs:
+            return StdlibJsonDumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            return StdlibJsonDumps(obj)
+
+    json.dumps = OrjsonDumps
+except ImportError:
+    pass
+
+# Letting pandas skip defensive copies inside the pipeline's transform
+pd.options.mode.copy_on_write = True
+
 # Giving page a logo title and defining a layout
 st.set_page_config(
     page_title="Electric Vehicle Accident Predictor",
@@ -11,8 +42,11 @@ st.set_page_config(
     layout="wide"
 )
 
-# Adding custom CSS
-st.markdown("""
+# Adding custom CSS; the string is built once and cached, though it still
+# has to be emitted on every rerun or Streamlit drops the element
+@st.cache_data
+def PageCss():
+    return """
     <style>
     .main {
         padding: 3rem;
@@ -22,7 +56,9 @@ st.markdown("""
         margin-top: 2rem;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+st.markdown(PageCss(), unsafe_allow_html=True)
 
 # Making tabs
 tab1, tab2 = st.tabs(["Accident Predictor", "EV's Accident Heatmap"])
@@ -33,54 +69,100 @@ with tab1:
     st.markdown("""This application predicts the probability of casualties in electric vehicle accidents based on various factors mentioned in the lower end of this page.
     The model has been trained on dataset of accidents from New York City.""")
 
+    # Precomputed lookup tables for ZIP validation and region names, so the
+    # per-keystroke checks are a single array index instead of range scans
+    ValidNyZip = np.zeros(100000, dtype=bool)
+    ValidNyZip[10001:14926] = True  # New York City and surrounding areas
+    ValidNyZip[14925:15001] = True  # Capital Region
+
+    RegionNames = (
+        "Manhattan, NYC",
+        "Staten Island, NYC",
+        "Bronx, NYC",
+        "Queens, NYC",
+        "Brooklyn, NYC",
+        "New York City Area",
+        "Capital Region",
+        "Central New York",
+        "Western New York",
+        "Southern Tier",
+        "Unknown"
+    )
+    ZipRegion = np.full(100000, RegionNames.index("Unknown"), dtype=np.uint8)
+    # Lower precedence ranges are filled first and overwritten by higher
+    # precedence ones, matching first-match-wins of the old elif chain
+    ZipRegion[14801:14926] = RegionNames.index("Southern Tier")
+    ZipRegion[14001:14789] = RegionNames.index("Western New York")
+    ZipRegion[13001:13902] = RegionNames.index("Central New York")
+    ZipRegion[12007:12888] = RegionNames.index("Capital Region")
+    ZipRegion[10001:14926] = RegionNames.index("New York City Area")
+    ZipRegion[11201:11257] = RegionNames.index("Brooklyn, NYC")
+    ZipRegion[11001:11698] = RegionNames.index("Queens, NYC")
+    ZipRegion[10451:10476] = RegionNames.index("Bronx, NYC")
+    ZipRegion[10301:10315] = RegionNames.index("Staten Island, NYC")
+    ZipRegion[10001:10283] = RegionNames.index("Manhattan, NYC")
+
+    # Precomputed temporal-feature tables indexed by hour / weekday, so the
+    # feature prep is an array load instead of chained comparisons
+    IsRushHourByHour = np.zeros(24, dtype=bool)
+    IsRushHourByHour[7:10] = True
+    IsRushHourByHour[16:20] = True
+    IsNightTimeByHour = np.zeros(24, dtype=bool)
+    IsNightTimeByHour[22:] = True
+    IsNightTimeByHour[:6] = True
+    IsWeekendByDay = np.zeros(7, dtype=bool)
+    IsWeekendByDay[5:] = True
+
     # Function to validate New York City ZIP codes
     def is_valid_ny_zipcode(zipcode):
-        # New York City ZIP code ranges
-        NewYorkRanges = [
-            (10001, 14925),  # New York City and surrounding areas
-            (14925, 15000)  # Capital Region
-        ]
-        
-        try:
-            ZipCodeInt = int(zipcode)
-            return any(lower <= ZipCodeInt <= upper for lower, upper in NewYorkRanges)
-        except ValueError:
-            return False
+        return zipcode.isdigit() and len(zipcode) == 5 and bool(ValidNyZip[int(zipcode)])
 
     def GetRegion(zipcode):
         try:
             ZipCodeInt = int(zipcode)
-            if 10001 <= ZipCodeInt <= 14925:
-                if 10001 <= ZipCodeInt <= 10282:
-                    return "Manhattan, NYC"
-                elif 10301 <= ZipCodeInt <= 10314:
-                    return "Staten Island, NYC"
-                elif 10451 <= ZipCodeInt <= 10475:
-                    return "Bronx, NYC"
-                elif 11001 <= ZipCodeInt <= 11697:
-                    return "Queens, NYC"
-                elif 11201 <= ZipCodeInt <= 11256:
-                    return "Brooklyn, NYC"
-                else:
-                    return "New York City Area"
-            elif 12007 <= ZipCodeInt <= 12887:
-                return "Capital Region"
-            elif 13001 <= ZipCodeInt <= 13901:
-                return "Central New York"
-            elif 14001 <= ZipCodeInt <= 14788:
-                return "Western New York"
-            elif 14801 <= ZipCodeInt <= 14925:
-                return "Southern Tier"
-            return "Unknown"
         except ValueError:
             return "Invalid"
+        if 0 <= ZipCodeInt < 100000:
+            return RegionNames[ZipRegion[ZipCodeInt]]
+        return "Unknown"
+
+    # Column order and dtypes the pipeline was fitted on, so the input frame
+    # can be built from numpy arrays instead of one-element Python lists
+    InputSchema = [
+        ('Month', np.int64),
+        ('Day', np.int64),
+        ('Hour', np.int64),
+        ('DayOfWeek', np.int64),
+        ('VEHICLE TYPE CODE 2', object),
+        ('ZIP CODE', np.int64),
+        ('CONTRIBUTING FACTOR VEHICLE 1', object),
+        ('IsRushHour', np.int64),
+        ('IsWeekend', np.int64),
+        ('IsNightTime', np.int64)
+    ]
+
+    # The categorical options are fixed, so the lists are built once at
+    # import instead of on every rerun inside the form
+    VehicleTypeOptions = ["sedan", "suv", "bus", "bicycle", "truck", "van", "motorcycle"]
+    ContributingFactorOptions = [
+        "driver inattention/distraction",
+        "failure to yield right-of-way",
+        "following too closely",
+        "unsafe speed",
+        "unsafe lane changing",
+        "backing unsafely",
+        "other"
+    ]
 
     # Loading the model
     @st.cache_resource
     def LoadingModel():
-        with open('LR_model_f1_0.6133.pkl', 'rb') as file:
-            model = pickle.load(file)
-        return model
+        # joblib with mmap_mode memory-maps the coefficient arrays instead of
+        # copying them into the heap, which makes the cold start faster
+        if not os.path.exists('model.joblib'):
+            with open('LR_model_f1_0.6133.pkl', 'rb') as file:
+                joblib.dump(pickle.load(file), 'model.joblib', compress=0)
+        return joblib.load('model.joblib', mmap_mode='r')
 
     try:
         model = LoadingModel()
@@ -89,83 +171,217 @@ with tab1:
         st.error(f"Error loading model: {str(e)}")
         st.stop()
 
-    # Createing the columns for the layout
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.subheader("Information")
-        
-        # For input
-        date_time = st.date_input("Select Date", datetime.now())
-        hour = st.slider("Hour of Day", 0, 23, 12)
-        
-        # Calculate time related features
-        month = date_time.month
-        day = date_time.day
-        day_of_week = date_time.weekday()  # 0=Monday, 6=Sunday
-        is_rush_hour = 1 if (7 <= hour <= 9) or (16 <= hour <= 19) else 0
-        is_weekend = 1 if day_of_week >= 5 else 0
-        is_night_time = 1 if (hour >= 22) or (hour <= 5) else 0
-
-    with col2:
-        st.subheader("Vehicle and Location Information")
-        
-        # Vehicle type selection
-        vehicle_type = st.selectbox(
-            "Vehicle Type",
-            ["sedan", "suv", "bus", "bicycle", "truck", "van", "motorcycle"]
-        )
-        
-        # Contributing factor selection
-        contributing_factor = st.selectbox(
-            "Contributing Factor",
-            [
-                "driver inattention/distraction",
-                "failure to yield right-of-way",
-                "following too closely",
-                "unsafe speed",
-                "unsafe lane changing",
-                "backing unsafely",
-                "other"
-            ]
-        )
-        
-        # ZIP code input
-        ZipCodeText = st.text_input("Zip Code", "10001")
+    # Flattening the fitted pipeline into plain numpy arrays once at load
+    # time, so a prediction is a dot product instead of a ColumnTransformer
+    # transform over a one-row DataFrame
+    @st.cache_resource
+    def FlattenedModel():
+        try:
+            preprocessor = model.named_steps['preprocessor']
+            encoder = preprocessor.named_transformers_['cat']
+            classifier = model.named_steps['model']
+            ColumnPositions = {column: index for index, (column, dtype) in enumerate(InputSchema)}
+            NumericValueIndices = tuple(
+                ColumnPositions[column] for column in preprocessor.transformers_[0][2]
+            )
+            VehicleCategories = {category: index for index, category in enumerate(encoder.categories_[0])}
+            FactorCategories = {category: index for index, category in enumerate(encoder.categories_[1])}
+            weights = classifier.coef_[0].astype(np.float32)
+            intercept = np.float32(classifier.intercept_[0])
+        except (AttributeError, KeyError, IndexError):
+            # Unexpected pipeline layout; the worker falls back to sklearn
+            return None
+
+        # The numeric weights stay float32 (their inputs can be large, e.g.
+        # the ZIP code), but the one-hot segments only ever contribute a
+        # single weight each, so they are quantized to int8 plus a scale
+        def QuantizeWeights(segment):
+            scale = np.float32(np.max(np.abs(segment)) / 127.0) if segment.size else np.float32(1.0)
+            if scale == 0.0:
+                scale = np.float32(1.0)
+            return np.round(segment / scale).astype(np.int8), scale
+
+        NumNumeric = len(NumericValueIndices)
+        NumericWeights = weights[:NumNumeric]
+        VehicleQuantized, VehicleScale = QuantizeWeights(
+            weights[NumNumeric:NumNumeric + len(VehicleCategories)])
+        FactorQuantized, FactorScale = QuantizeWeights(
+            weights[NumNumeric + len(VehicleCategories):])
+        return (NumericWeights, VehicleQuantized, VehicleScale, FactorQuantized,
+                FactorScale, intercept, NumericValueIndices, VehicleCategories,
+                FactorCategories)
+
+    def FastPredictBatch(rows, flattened):
+        # Computing the logistic regression directly: a dot product for the
+        # numeric features plus one dequantized weight per one-hot segment,
+        # instead of materializing the full encoded vector
+        if flattened is None:
+            return None
+        (NumericWeights, VehicleQuantized, VehicleScale, FactorQuantized,
+         FactorScale, intercept, NumericValueIndices, VehicleCategories,
+         FactorCategories) = flattened
+        NumNumeric = len(NumericValueIndices)
+        logits = np.empty(len(rows), dtype=np.float32)
+        for position, row in enumerate(rows):
+            numeric = np.fromiter((row[index] for index in NumericValueIndices),
+                                  dtype=np.float32, count=NumNumeric)
+            logit = intercept + numeric @ NumericWeights
+            # Unknown categories contribute nothing, like handle_unknown='ignore'
+            VehicleIndex = VehicleCategories.get(row[4])
+            if VehicleIndex is not None:
+                logit += VehicleQuantized[VehicleIndex] * VehicleScale
+            FactorIndex = FactorCategories.get(row[6])
+            if FactorIndex is not None:
+                logit += FactorQuantized[FactorIndex] * FactorScale
+            logits[position] = logit
+        probabilities = 1.0 / (1.0 + np.exp(-logits))
+        labels = (probabilities >= 0.5).astype(int)
+        return labels, probabilities
+
+    # Batching settings: the worker waits up to the window for more requests
+    # and the batch size is bounded so the first waiter is not starved
+    BatchWindowSeconds = 0.02
+    MaxBatchSize = 32
+    PredictTimeoutSeconds = 5.0
+
+    def BatchingWorker(RequestQueue, flattened):
+        # Draining queued requests from concurrent sessions into one batch,
+        # so the pipeline runs once per batch instead of once per user
+        while True:
+            batch = [RequestQueue.get()]
+            deadline = time.monotonic() + BatchWindowSeconds
+            while len(batch) < MaxBatchSize:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(RequestQueue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows = [values for values, future in batch]
+            try:
+                results = FastPredictBatch(rows, flattened)
+                if results is not None:
+                    predictions, probabilities = results
+                else:
+                    # np.fromiter fills each preallocated column straight from
+                    # the row tuples without an intermediate list per column
+                    input_data = pd.DataFrame({
+                        column: np.fromiter((row[index] for row in rows),
+                                            dtype=dtype, count=len(rows))
+                        for index, (column, dtype) in enumerate(InputSchema)
+                    })
+                    predictions = model.predict(input_data)
+                    probabilities = model.predict_proba(input_data)[:, 1]
+                for (values, future), label, probability in zip(batch, predictions, probabilities):
+                    future.set_result((int(label), float(probability)))
+            except Exception as error:
+                for values, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    # Starting the worker thread once and sharing its queue across sessions
+    @st.cache_resource
+    def StartingBatcher():
+        RequestQueue = queue.Queue()
+        worker = threading.Thread(target=BatchingWorker,
+                                  args=(RequestQueue, FlattenedModel()), daemon=True)
+        worker.start()
+        return RequestQueue
+
+    # Caching predictions on the 10 scalar inputs, so reruns with unchanged
+    # inputs hit a hash lookup instead of re-running the sklearn pipeline
+    @st.cache_data(max_entries=512)
+    def CachedPredict(month, day, hour, day_of_week, vehicle_type, zip_code,
+                      contributing_factor, is_rush_hour, is_weekend, is_night_time):
+        future = Future()
+        StartingBatcher().put((
+            (month, day, hour, day_of_week, vehicle_type, zip_code,
+             contributing_factor, is_rush_hour, is_weekend, is_night_time),
+            future
+        ))
+        return future.result(timeout=PredictTimeoutSeconds)
+
+    # Validating the ZIP code once per submit and stashing the result in
+    # session state, instead of revalidating on every rerun
+    def ValidateZipCode():
+        # Parsing the ZIP once and indexing both tables directly, instead of
+        # two wrapper calls that each re-parse the string
+        zipcode = st.session_state.ZipCodeInput
+        try:
+            ZipCodeInt = int(zipcode)
+        except ValueError:
+            st.session_state.ZipOk = False
+            st.session_state.Region = "Invalid"
+            return
+        InRange = 0 <= ZipCodeInt < 100000
+        st.session_state.ZipOk = (zipcode.isdigit() and len(zipcode) == 5
+                                  and InRange and bool(ValidNyZip[ZipCodeInt]))
+        st.session_state.Region = RegionNames[ZipRegion[ZipCodeInt]] if InRange else "Unknown"
+
+    # Grouping the inputs in a form, so typing in a widget no longer reruns
+    # the whole script; everything is processed once on submit
+    with st.form("prediction_form"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("Information")
+
+            # For input; the default date is captured once per session so
+            # datetime.now() is not re-evaluated on every rerun
+            if "Today" not in st.session_state:
+                st.session_state.Today = datetime.now().date()
+            date_time = st.date_input("Select Date", st.session_state.Today)
+            hour = st.slider("Hour of Day", 0, 23, 12)
+
+            # Calculate time related features
+            month = date_time.month
+            day = date_time.day
+            day_of_week = date_time.weekday()  # 0=Monday, 6=Sunday
+            is_rush_hour = int(IsRushHourByHour[hour])
+            is_weekend = int(IsWeekendByDay[day_of_week])
+            is_night_time = int(IsNightTimeByHour[hour])
+
+        with col2:
+            st.subheader("Vehicle and Location Information")
+
+            # Vehicle type selection
+            vehicle_type = st.selectbox("Vehicle Type", VehicleTypeOptions)
+
+            # Contributing factor selection
+            contributing_factor = st.selectbox("Contributing Factor", ContributingFactorOptions)
+
+            # ZIP code input
+            ZipCodeText = st.text_input("Zip Code", "10001", key="ZipCodeInput")
+
+        # Making the prediction button
+        submitted = st.form_submit_button("Predict Accident Severity", on_click=ValidateZipCode)
+
+    # Showing the validation feedback from the last submit
+    if submitted:
         if not ZipCodeText.isdigit() or len(ZipCodeText) != 5:
             st.warning("Please enter a valid 5-digit ZIP code")
-        elif not is_valid_ny_zipcode(ZipCodeText):
+        elif not st.session_state.ZipOk:
             st.error("This ZIP code is not in New York City. Please enter a valid NY ZIP code.")
         else:
-            region = GetRegion(ZipCodeText)
+            region = st.session_state.Region
             st.success(f"Valid New York City ZIP code.")
 
-    # Making the prediction button
-    if st.button("Predict Accident Severity"):
+    if submitted:
         try:
-            # Check if the zip code is in new york
-            if not is_valid_ny_zipcode(ZipCodeText):
+            # The submit callback already validated the zip code
+            if not st.session_state.get("ZipOk"):
                 st.error("Cannot make prediction: Please enter a valid New York City ZIP code.")
                 st.stop()
                 
-            # Creating input data
-            input_data = pd.DataFrame({
-                'Month': [month],
-                'Day': [day],
-                'Hour': [hour],
-                'DayOfWeek': [day_of_week],
-                'VEHICLE TYPE CODE 2': [vehicle_type],
-                'ZIP CODE': [int(ZipCodeText)],
-                'CONTRIBUTING FACTOR VEHICLE 1': [contributing_factor],
-                'IsRushHour': [is_rush_hour],
-                'IsWeekend': [is_weekend],
-                'IsNightTime': [is_night_time]
-            })
-            
-            # makeing predictions
-            prediction = model.predict(input_data)
-            PredictionProbability = model.predict_proba(input_data)[0]
-            
+            # makeing predictions (cached on the inputs)
+            prediction, CasualtyProbability = CachedPredict(
+                month, day, hour, day_of_week, vehicle_type,
+                int(ZipCodeText), contributing_factor,
+                is_rush_hour, is_weekend, is_night_time
+            )
+
             # Displaying results
             st.header("Prediction Results")
             
@@ -175,13 +391,13 @@ with tab1:
             with res_col1:
                 st.metric(
                     "Prediction",
-                    "Casualty Likely" if prediction[0] == 1 else "No Casualty Likely"
+                    "Casualty Likely" if prediction == 1 else "No Casualty Likely"
                 )
-                
+
             with res_col2:
                 st.metric(
                     "Probability",
-                    f"{PredictionProbability[1]:.2%}"
+                    f"{CasualtyProbability:.2%}"
                 )
             
             # Calculating risk related information
@@ -202,9 +418,10 @@ with tab1:
         except Exception as e:
             st.error(f"Error making prediction: {str(e)}")
 
-    # Adding information related to models
-    st.markdown("---")
-    st.markdown("""
+    # Adding information related to models; cached like the CSS above
+    @st.cache_data
+    def AboutTheModel():
+        return """
     ### About the Model
     This model was trained on old accident data from New York City involving electric vehicles.
     The prediction is based on various factors including:
@@ -217,7 +434,10 @@ with tab1:
 
     Note: This model is only valid for accidents within New York City ZIP codes.
     Valid NY City ZIP code ranges:
-    - New York City and surrounding areas: 10001-14925""")
+    - New York City and surrounding areas: 10001-14925"""
+
+    st.markdown("---")
+    st.markdown(AboutTheModel())
 
 with tab2:
     st.title("🗺️ EV Accident Heatmap")
@@ -226,14 +446,15 @@ with tab2:
     The intensity of the color indicates the frequency of accidents in each area. Here red means that there are more accidents, and green means less number of accidents.
     """)
     
-    # Reading and display the heatmap
-    try:
-        with open('ev_heatmap.html', 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Displaying the heatmap
-        components.html(html_content, height=1200)
-        
-        
-    except Exception as e:
-        st.error(f"Error loading heatmap: {str(e)}") 
\ No newline at end of file
+    # The heatmap file is served from the static mount (enableStaticServing
+    # in .streamlit/config.toml), so the browser fetches it directly and no
+    # Python-side file read or string copy happens at all
+    # Only embedding the heatmap after the user asks for it, so interactions
+    # in the predictor tab never pay for rendering the large map
+    if st.button("Load heatmap") or st.session_state.get("HeatmapLoaded"):
+        st.session_state.HeatmapLoaded = True
+        # Preferring the minified copy produced by scripts/prepare_heatmap.py
+        if os.path.exists(os.path.join('static', 'ev_heatmap.min.html')):
+            components.iframe("./app/static/ev_heatmap.min.html", height=1200)
+        else:
+            components.iframe("./app/static/ev_heatmap.html", height=1200) 
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""One-shot preprocessing for the accident heatmap.
+
+Minifies static/ev_heatmap.html (when htmlmin is installed) and writes a
+gzip-compressed copy next to it, so a front proxy that serves
+precompressed assets with Content-Encoding: gzip moves a fraction of the
+bytes. The app itself picks up the minified file when it exists.
+
+Run from the repository root:
+
+    python scripts/prepare_heatmap.py
+"""
+
+import gzip
+import os
+
+SOURCE = os.path.join('static', 'ev_heatmap.html')
+MINIFIED = os.path.join('static', 'ev_heatmap.min.html')
+
+
+def main():
+    with open(SOURCE, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    try:
+        import htmlmin
+        # Folium embeds its map logic in inline scripts, so only comments
+        # and inter-tag whitespace are stripped
+        html = htmlmin.minify(html, remove_comments=True, remove_empty_space=True)
+    except ImportError:
+        print("htmlmin not installed; compressing the markup as-is")
+
+    with open(MINIFIED, 'w', encoding='utf-8') as f:
+        f.write(html)
+    with gzip.open(MINIFIED + '.gz', 'wb', compresslevel=9) as f:
+        f.write(html.encode('utf-8'))
+
+    for path in (SOURCE, MINIFIED, MINIFIED + '.gz'):
+        print(f"{path}: {os.path.getsize(path)} bytes")
+
+
+if __name__ == '__main__':
+    main()